@@ -0,0 +1,224 @@
+"""Concrete ReAct agent runtime.
+
+The ``ReActAgent`` sketches in ``react.ipynb`` keep an unbounded memory list
+and run reason/act/observe strictly in sequence. This runtime fills them in:
+
+- the independent tool calls of one reasoning step run concurrently on asyncio
+- tool results are memoized in a TTL cache
+- memory is a bounded window of recent steps plus a summary store
+- every step records its latency, so multi-tool turns can be compared
+
+``StubLLM`` replays a fixed script so runs are deterministic. Run
+``python react_agent.py`` for a sequential vs parallel comparison.
+"""
+import asyncio
+import inspect
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+_MISSING = object()
+
+
+@dataclass(frozen=True)
+class Action:
+    tool: str
+    argument: str
+
+
+@dataclass
+class Step:
+    thought: str
+    actions: List[Action] = field(default_factory=list)
+    final_answer: Optional[str] = None
+
+
+@dataclass
+class StepTrace:
+    thought: str
+    observations: Dict[Action, Any]
+    latency: float
+    cache_hits: int
+
+
+class TTLCache:
+    """LRU cache whose entries expire ``ttl`` seconds after being stored."""
+
+    def __init__(self, ttl: float = 60.0, max_size: int = 256, clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.clock = clock
+        self._entries: "OrderedDict[Any, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key, default=None):
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        expires_at, value = entry
+        if expires_at <= self.clock():
+            del self._entries[key]
+            return default
+        self._entries.move_to_end(key)
+        return value
+
+    def __contains__(self, key) -> bool:
+        sentinel = object()
+        return self.get(key, sentinel) is not sentinel
+
+    def set(self, key, value) -> None:
+        self._entries[key] = (self.clock() + self.ttl, value)
+        self._entries.move_to_end(key)
+        self.evict()
+
+    def evict(self) -> None:
+        now = self.clock()
+        for key in [k for k, (expires_at, _) in self._entries.items() if expires_at <= now]:
+            del self._entries[key]
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def summarize_step(step: StepTrace) -> str:
+    observations = ", ".join(f"{a.tool}({a.argument})={str(o)[:40]}" for a, o in step.observations.items())
+    return f"{step.thought} -> {observations}" if observations else step.thought
+
+
+class AgentMemory:
+    """Keeps the last ``window`` steps verbatim and summaries of older ones."""
+
+    def __init__(self, window: int = 4, max_summaries: int = 16,
+                 summarizer: Callable[[StepTrace], str] = summarize_step):
+        self.steps: deque = deque(maxlen=window)
+        self.summaries: deque = deque(maxlen=max_summaries)
+        self.summarizer = summarizer
+
+    def add(self, step: StepTrace) -> None:
+        if len(self.steps) == self.steps.maxlen:
+            self.summaries.append(self.summarizer(self.steps[0]))
+        self.steps.append(step)
+
+    def context(self) -> Dict[str, list]:
+        return {"summaries": list(self.summaries), "recent": list(self.steps)}
+
+
+class StubLLM:
+    """Deterministic stand-in for a language model: replays a scripted list of steps."""
+
+    def __init__(self, script: List[Step], latency: float = 0.0):
+        self.script = script
+        self.latency = latency
+        self.calls = 0
+
+    async def reason(self, question: str, context: Dict[str, list]) -> Step:
+        await asyncio.sleep(self.latency)
+        step = self.script[min(self.calls, len(self.script) - 1)]
+        self.calls += 1
+        return step
+
+
+class ReActAgent:
+    def __init__(self, llm, tools: Dict[str, Callable], cache: Optional[TTLCache] = None,
+                 memory: Optional[AgentMemory] = None, parallel: bool = True):
+        self.llm = llm
+        self.tools = tools
+        self.cache = cache if cache is not None else TTLCache()
+        self.memory = memory if memory is not None else AgentMemory()
+        self.parallel = parallel
+        self.trace: List[StepTrace] = []
+
+    async def _call_tool(self, action: Action):
+        tool = self.tools.get(action.tool)
+        if tool is None:
+            return f"Error: unknown tool {action.tool!r}"
+        try:
+            if inspect.iscoroutinefunction(tool):
+                result = await tool(action.argument)
+            else:
+                # Blocking tools run in a worker thread so they can still overlap
+                result = await asyncio.to_thread(tool, action.argument)
+        except Exception as e:
+            return f"Error: {e}"
+        self.cache.set(action, result)
+        return result
+
+    async def act(self, actions: List[Action]) -> Tuple[Dict[Action, Any], int]:
+        observations = {}
+        pending = []
+        for action in dict.fromkeys(actions):  # drop duplicate calls, keep order
+            cached = self.cache.get(action, _MISSING)
+            if cached is _MISSING:
+                pending.append(action)
+            else:
+                observations[action] = cached
+        cache_hits = len(observations)
+
+        if self.parallel:
+            results = await asyncio.gather(*(self._call_tool(a) for a in pending))
+        else:
+            results = [await self._call_tool(a) for a in pending]
+        observations.update(zip(pending, results))
+        return {a: observations[a] for a in dict.fromkeys(actions)}, cache_hits
+
+    async def solve(self, question: str, max_steps: int = 10) -> str:
+        for _ in range(max_steps):
+            start = time.perf_counter()
+            step = await self.llm.reason(question, self.memory.context())
+            if step.final_answer is not None:
+                self.trace.append(StepTrace(step.thought, {}, time.perf_counter() - start, 0))
+                return step.final_answer
+            observations, cache_hits = await self.act(step.actions)
+            trace = StepTrace(step.thought, observations, time.perf_counter() - start, cache_hits)
+            self.trace.append(trace)
+            self.memory.add(trace)
+        return "Max iterations reached without solution"
+
+
+def _make_network_tools(latency: float) -> Dict[str, Callable]:
+    async def ping(host):
+        await asyncio.sleep(latency)
+        return f"{host}: 4 packets, 0% loss"
+
+    async def dns_lookup(host):
+        await asyncio.sleep(latency)
+        return f"{host} -> 93.184.216.34"
+
+    def traceroute(host):
+        time.sleep(latency)
+        return f"{host}: 7 hops"
+
+    return {"ping": ping, "dns_lookup": dns_lookup, "traceroute": traceroute}
+
+
+NETWORK_SCRIPT = [
+    Step("Check reachability and name resolution of both hosts", [
+        Action("ping", "example.com"), Action("ping", "gateway"),
+        Action("dns_lookup", "example.com"), Action("traceroute", "example.com"),
+    ]),
+    Step("Re-check the remote host", [
+        Action("ping", "example.com"), Action("dns_lookup", "example.com"),
+        Action("traceroute", "example.com"),
+    ]),
+    Step("Check the DNS server itself", [
+        Action("ping", "8.8.8.8"), Action("dns_lookup", "gateway"),
+    ]),
+    Step("Everything responds", final_answer="Network is healthy"),
+]
+
+
+async def main():
+    for parallel in (False, True):
+        agent = ReActAgent(StubLLM(NETWORK_SCRIPT), _make_network_tools(0.1), parallel=parallel)
+        answer = await agent.solve("Why is example.com slow?")
+        print(f"{'parallel' if parallel else 'sequential'}: {answer}")
+        for i, step in enumerate(agent.trace):
+            print(f"  step {i}: {len(step.observations)} tools, "
+                  f"{step.cache_hits} cached, {step.latency * 1e3:.1f} ms")
+        print(f"  total: {sum(s.latency for s in agent.trace) * 1e3:.1f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
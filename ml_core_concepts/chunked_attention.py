@@ -0,0 +1,174 @@
+"""Memory-efficient attention for long sequences.
+
+``self-attention.ipynb`` builds the full (seq_len, seq_len) score matrix before
+the softmax, so memory grows quadratically with the sequence length. Here the
+keys are processed in tiles with an online (running max / running sum)
+softmax, so only a (block_size, block_size) tile of scores exists at any time
+and the result matches the reference up to float rounding.
+
+Run ``python chunked_attention.py`` for a CPU memory/latency benchmark.
+"""
+import argparse
+import multiprocessing
+import queue as queue_module
+import signal
+import threading
+import time
+
+import psutil
+import torch
+import torch.nn.functional as F
+
+
+def reference_attention(Q, K, V, causal=False):
+    # Same computation as the notebook, materializing all scores at once
+    attention_scores = torch.matmul(Q, K.transpose(-2, -1)) / (Q.shape[-1] ** 0.5)
+    if causal:
+        q_len, k_len = Q.shape[-2], K.shape[-2]
+        mask = torch.ones(q_len, k_len, dtype=torch.bool, device=Q.device).triu(k_len - q_len + 1)
+        attention_scores = attention_scores.masked_fill(mask, float("-inf"))
+    attention_weights = F.softmax(attention_scores, dim=-1)
+    return torch.matmul(attention_weights, V)
+
+
+def chunked_attention(Q, K, V, causal=False, block_size=512):
+    """Scaled dot-product attention computed tile by tile.
+
+    Q: (..., q_len, d), K: (..., k_len, d), V: (..., k_len, d_v). With
+    ``causal=True`` query ``i`` attends to keys ``<= i + (k_len - q_len)``,
+    i.e. the queries are the last ``q_len`` positions of the key sequence.
+    """
+    q_len, k_len = Q.shape[-2], K.shape[-2]
+    offset = k_len - q_len
+    scale = Q.shape[-1] ** -0.5
+    output = Q.new_empty(*Q.shape[:-1], V.shape[-1])
+
+    for q_start in range(0, q_len, block_size):
+        q_end = min(q_start + block_size, q_len)
+        q = Q[..., q_start:q_end, :] * scale
+        row_max = q.new_full((*q.shape[:-1], 1), float("-inf"))
+        row_sum = q.new_zeros((*q.shape[:-1], 1))
+        acc = q.new_zeros((*q.shape[:-1], V.shape[-1]))
+
+        # Tiles entirely above the diagonal contribute nothing under a causal mask
+        k_stop = min(k_len, q_end + offset) if causal else k_len
+        for k_start in range(0, k_stop, block_size):
+            k_end = min(k_start + block_size, k_len)
+            scores = torch.matmul(q, K[..., k_start:k_end, :].transpose(-2, -1))
+            if causal and k_end - 1 > q_start + offset:
+                q_idx = torch.arange(q_start, q_end, device=Q.device).unsqueeze(-1)
+                k_idx = torch.arange(k_start, k_end, device=Q.device).unsqueeze(0)
+                scores = scores.masked_fill(k_idx > q_idx + offset, float("-inf"))
+
+            new_max = torch.maximum(row_max, scores.amax(dim=-1, keepdim=True))
+            # Rows with every key masked so far keep -inf; shift by 0 to avoid inf - inf
+            safe_max = new_max.masked_fill(new_max == float("-inf"), 0.0)
+            probs = torch.exp(scores - safe_max)
+            correction = torch.exp(row_max - safe_max)
+            row_sum = row_sum * correction + probs.sum(dim=-1, keepdim=True)
+            acc = acc * correction + torch.matmul(probs, V[..., k_start:k_end, :])
+            row_max = new_max
+
+        output[..., q_start:q_end, :] = acc / row_sum
+    return output
+
+
+class _PeakRSSSampler(threading.Thread):
+    # Polls the resident set size in the background; torch releases the GIL
+    # inside its kernels, so the sampler keeps running during the call
+    def __init__(self, interval=0.001):
+        super().__init__(daemon=True)
+        self.process = psutil.Process()
+        self.interval = interval
+        self.peak = self.process.memory_info().rss
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            self.peak = max(self.peak, self.process.memory_info().rss)
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        self.peak = max(self.peak, self.process.memory_info().rss)
+        return self.peak
+
+
+def _measure(name, seq_len, dim, block_size, causal, queue):
+    # Runs in a fresh process so one run's allocations do not leak into the next
+    torch.manual_seed(0)
+    Q, K, V = (torch.randn(1, seq_len, dim) for _ in range(3))
+    baseline = psutil.Process().memory_info().rss
+    sampler = _PeakRSSSampler()
+    sampler.start()
+    start = time.perf_counter()
+    if name == "reference":
+        reference_attention(Q, K, V, causal)
+    else:
+        chunked_attention(Q, K, V, causal, block_size)
+    elapsed = time.perf_counter() - start
+    queue.put((elapsed, (sampler.stop() - baseline) / 2**20))
+
+
+def measure(name, seq_len, dim, block_size, causal):
+    """Return (seconds, peak MiB) for one run, or a status string if the child died."""
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    process = ctx.Process(target=_measure, args=(name, seq_len, dim, block_size, causal, queue))
+    process.start()
+    result = None
+    while result is None:
+        try:
+            result = queue.get(timeout=1.0)
+        except queue_module.Empty:
+            if not process.is_alive():
+                break
+    process.join()
+    if result is not None:
+        return result
+    # The OOM killer sends SIGKILL, which shows up as a negative exit code
+    if process.exitcode == -getattr(signal, "SIGKILL", 9):
+        return "OOM"
+    return f"failed ({process.exitcode})"
+
+
+def _format_row(result, time_width, mem_width):
+    if isinstance(result, str):
+        return f"{result:>{time_width}} {'-':>{mem_width}}"
+    elapsed, memory = result
+    return f"{elapsed * 1e3:>{time_width}.1f} {memory:>{mem_width}.1f}"
+
+
+def benchmark(seq_lens, dim=64, block_size=512, causal=True, max_reference_len=8192):
+    torch.manual_seed(0)
+    Q, K, V = (torch.randn(2, 4, 1000, dim) for _ in range(3))
+    for is_causal in (False, True):
+        expected = reference_attention(Q, K, V, is_causal)
+        actual = chunked_attention(Q, K, V, is_causal, block_size=128)
+        torch.testing.assert_close(actual, expected, rtol=1e-4, atol=1e-5)
+    print("chunked output matches reference (causal and non-causal)")
+
+    print(f"{'seq_len':>8} {'ref ms':>10} {'ref MiB':>9} {'chunked ms':>11} {'chunked MiB':>12}")
+    for seq_len in seq_lens:
+        if max_reference_len is None or seq_len <= max_reference_len:
+            ref = _format_row(measure("reference", seq_len, dim, block_size, causal), 10, 9)
+        else:
+            ref = f"{'skipped':>10} {'-':>9}"
+        chunked = _format_row(measure("chunked", seq_len, dim, block_size, causal), 11, 12)
+        print(f"{seq_len:>8} {ref} {chunked}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chunked attention benchmark (CPU)")
+    parser.add_argument("--seq-lens", type=int, nargs="+", default=[1024, 2048, 4096, 8192, 16384])
+    parser.add_argument("--dim", type=int, default=64)
+    parser.add_argument("--block-size", type=int, default=512)
+    parser.add_argument("--no-causal", action="store_true")
+    parser.add_argument(
+        "--max-reference-len", type=int, default=8192,
+        help="skip the reference above this length; 16k needs several GiB of RAM (0 = no limit)",
+    )
+    args = parser.parse_args()
+
+    benchmark(args.seq_lens, args.dim, args.block_size, not args.no_causal, args.max_reference_len or None)
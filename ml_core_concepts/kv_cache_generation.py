@@ -0,0 +1,248 @@
+"""Incremental decoding with a key/value cache.
+
+Extends the single-head attention from ``self-attention.ipynb`` to a small
+causal language model. During generation every layer keeps the keys and
+values it has already computed, so each new token only projects itself and
+attends over the cache: O(n) work per token instead of recomputing the full
+``Q @ K^T`` over the whole sequence.
+
+Run ``python kv_cache_generation.py`` for a CPU tokens/sec benchmark.
+"""
+import argparse
+import math
+import time
+
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+
+
+class KVCache:
+    """Per-layer key/value cache with sliding-window eviction.
+
+    ``keys[i]`` / ``values[i]`` have shape (batch, heads, cached_len, head_dim)
+    and ``key_mask`` (batch, cached_len) marks real tokens (False for padding).
+    """
+
+    def __init__(self, num_layers, window=None):
+        self.window = window
+        self.keys = [None] * num_layers
+        self.values = [None] * num_layers
+        self.key_mask = None
+
+    def __len__(self):
+        return 0 if self.key_mask is None else self.key_mask.shape[1]
+
+    def append_mask(self, attention_mask):
+        if self.key_mask is None:
+            self.key_mask = attention_mask
+        else:
+            self.key_mask = torch.cat([self.key_mask, attention_mask], dim=1)
+        return self.key_mask
+
+    def update(self, layer_idx, K, V):
+        if self.keys[layer_idx] is not None:
+            K = torch.cat([self.keys[layer_idx], K], dim=2)
+            V = torch.cat([self.values[layer_idx], V], dim=2)
+        self.keys[layer_idx] = K
+        self.values[layer_idx] = V
+        return K, V
+
+    def evict(self):
+        # Keep only the most recent `window` slots; older ones can no longer be attended
+        if self.window is None or len(self) <= self.window:
+            return
+        self.key_mask = self.key_mask[:, -self.window:]
+        self.keys = [k[:, :, -self.window:] for k in self.keys]
+        self.values = [v[:, :, -self.window:] for v in self.values]
+
+
+def build_attention_mask(key_mask, query_len, window=None):
+    # key_mask: (batch, key_len) -> (batch, query_len, key_len), True = may attend.
+    # The queries are the last `query_len` key slots.
+    key_len = key_mask.shape[1]
+    q_idx = torch.arange(key_len - query_len, key_len, device=key_mask.device).unsqueeze(-1)
+    k_idx = torch.arange(key_len, device=key_mask.device).unsqueeze(0)
+    allowed = k_idx <= q_idx
+    if window is not None:
+        allowed = allowed & (k_idx > q_idx - window)
+    return allowed.unsqueeze(0) & key_mask.unsqueeze(1)
+
+
+def sinusoidal_positions(position_ids, embed_dim):
+    half = embed_dim // 2
+    freqs = torch.exp(-math.log(10000.0) * torch.arange(half, device=position_ids.device) / half)
+    angles = position_ids.unsqueeze(-1).float() * freqs
+    return torch.cat([angles.sin(), angles.cos()], dim=-1)
+
+
+class CausalSelfAttention(nn.Module):
+    def __init__(self, embed_dim, num_heads, layer_idx):
+        super().__init__()
+        assert embed_dim % num_heads == 0
+        self.num_heads = num_heads
+        self.head_dim = embed_dim // num_heads
+        self.layer_idx = layer_idx
+        self.W_q = nn.Linear(embed_dim, embed_dim, bias=False)
+        self.W_k = nn.Linear(embed_dim, embed_dim, bias=False)
+        self.W_v = nn.Linear(embed_dim, embed_dim, bias=False)
+        self.W_o = nn.Linear(embed_dim, embed_dim, bias=False)
+
+    def _split_heads(self, x):
+        batch_size, seq_len, _ = x.shape
+        return x.view(batch_size, seq_len, self.num_heads, self.head_dim).transpose(1, 2)
+
+    def forward(self, x, attn_mask, cache=None):
+        Q = self._split_heads(self.W_q(x))  # (b, h, t, hd)
+        K = self._split_heads(self.W_k(x))
+        V = self._split_heads(self.W_v(x))
+        if cache is not None:
+            K, V = cache.update(self.layer_idx, K, V)  # (b, h, s, hd)
+
+        attention_scores = torch.matmul(Q, K.transpose(-2, -1)) / (self.head_dim ** 0.5)
+        # finfo.min instead of -inf so fully padded rows stay finite
+        attention_scores = attention_scores.masked_fill(
+            ~attn_mask.unsqueeze(1), torch.finfo(attention_scores.dtype).min
+        )
+        attention_weights = F.softmax(attention_scores, dim=-1)
+        output = torch.matmul(attention_weights, V)  # (b, h, t, hd)
+
+        batch_size, _, seq_len, _ = output.shape
+        output = output.transpose(1, 2).reshape(batch_size, seq_len, -1)
+        return self.W_o(output)
+
+
+class DecoderBlock(nn.Module):
+    def __init__(self, embed_dim, num_heads, layer_idx):
+        super().__init__()
+        self.ln1 = nn.LayerNorm(embed_dim)
+        self.attn = CausalSelfAttention(embed_dim, num_heads, layer_idx)
+        self.ln2 = nn.LayerNorm(embed_dim)
+        self.mlp = nn.Sequential(
+            nn.Linear(embed_dim, 4 * embed_dim),
+            nn.GELU(),
+            nn.Linear(4 * embed_dim, embed_dim),
+        )
+
+    def forward(self, x, attn_mask, cache=None):
+        x = x + self.attn(self.ln1(x), attn_mask, cache)
+        return x + self.mlp(self.ln2(x))
+
+
+class TinyCausalLM(nn.Module):
+    def __init__(self, vocab_size, embed_dim=64, num_heads=4, num_layers=2):
+        super().__init__()
+        assert embed_dim % 2 == 0
+        self.embed_dim = embed_dim
+        self.num_layers = num_layers
+        self.token_embedding = nn.Embedding(vocab_size, embed_dim)
+        self.blocks = nn.ModuleList(
+            [DecoderBlock(embed_dim, num_heads, i) for i in range(num_layers)]
+        )
+        self.ln_f = nn.LayerNorm(embed_dim)
+        self.lm_head = nn.Linear(embed_dim, vocab_size, bias=False)
+
+    def forward(self, input_ids, attention_mask, position_ids, cache=None, window=None):
+        """Return logits (batch, seq_len, vocab_size) for ``input_ids``.
+
+        Without a cache ``input_ids`` is the whole sequence. With a cache it is
+        only the new tokens; their keys/values are appended and the cache is
+        trimmed to ``cache.window`` afterwards.
+        """
+        if cache is not None:
+            window = cache.window
+            key_mask = cache.append_mask(attention_mask)
+        else:
+            key_mask = attention_mask
+        attn_mask = build_attention_mask(key_mask, input_ids.shape[1], window)
+
+        x = self.token_embedding(input_ids) + sinusoidal_positions(position_ids, self.embed_dim)
+        for block in self.blocks:
+            x = block(x, attn_mask, cache)
+
+        if cache is not None:
+            cache.evict()
+        return self.lm_head(self.ln_f(x))
+
+
+def pad_prompts(prompts, pad_token_id=0):
+    # Left padding keeps the last prompt token of every row in the same column
+    max_len = max(len(p) for p in prompts)
+    input_ids = torch.full((len(prompts), max_len), pad_token_id, dtype=torch.long)
+    attention_mask = torch.zeros((len(prompts), max_len), dtype=torch.bool)
+    for i, prompt in enumerate(prompts):
+        if len(prompt):
+            input_ids[i, -len(prompt):] = torch.tensor(prompt, dtype=torch.long)
+            attention_mask[i, -len(prompt):] = True
+    return input_ids, attention_mask
+
+
+@torch.no_grad()
+def generate(model, prompts, max_new_tokens, pad_token_id=0, use_cache=True, window=None):
+    """Greedy decoding for a batch of token-id prompts of varying length.
+
+    Returns a (batch, max_new_tokens) tensor with the generated ids. The
+    cached and uncached paths produce the same tokens; ``window`` limits
+    attention to the most recent ``window`` positions in both.
+    """
+    input_ids, attention_mask = pad_prompts(prompts, pad_token_id)
+    position_ids = (attention_mask.long().cumsum(-1) - 1).clamp(min=0)
+    generated = []
+
+    if use_cache:
+        cache = KVCache(model.num_layers, window)
+        logits = model(input_ids, attention_mask, position_ids, cache)
+        next_position = position_ids[:, -1:]
+        step_mask = torch.ones((len(prompts), 1), dtype=torch.bool)
+        for i in range(max_new_tokens):
+            next_token = logits[:, -1].argmax(-1, keepdim=True)
+            generated.append(next_token)
+            if i == max_new_tokens - 1:
+                break  # the logits after the last token would be discarded
+            next_position = next_position + 1
+            logits = model(next_token, step_mask, next_position, cache)
+    else:
+        for _ in range(max_new_tokens):
+            logits = model(input_ids, attention_mask, position_ids, window=window)
+            next_token = logits[:, -1].argmax(-1, keepdim=True)
+            generated.append(next_token)
+            input_ids = torch.cat([input_ids, next_token], dim=1)
+            attention_mask = F.pad(attention_mask, (0, 1), value=True)
+            position_ids = torch.cat([position_ids, position_ids[:, -1:] + 1], dim=1)
+
+    return torch.cat(generated, dim=1)
+
+
+def benchmark(seq_lens, batch_size=4, new_tokens=32, vocab_size=1000, window=None):
+    torch.manual_seed(0)
+    model = TinyCausalLM(vocab_size).eval()
+    print(f"{'prompt_len':>10} {'uncached tok/s':>15} {'cached tok/s':>13} {'speedup':>8} {'match':>6}")
+    for seq_len in seq_lens:
+        # Ragged prompts so the padding mask is exercised
+        prompts = [
+            torch.randint(1, vocab_size, (seq_len - i,)).tolist() for i in range(batch_size)
+        ]
+        results = {}
+        for use_cache in (False, True):
+            start = time.perf_counter()
+            tokens = generate(model, prompts, new_tokens, use_cache=use_cache, window=window)
+            elapsed = time.perf_counter() - start
+            results[use_cache] = (tokens, batch_size * new_tokens / elapsed)
+        # Fraction of identical tokens; anything below 1.0 means the cache is wrong
+        match = (results[False][0] == results[True][0]).float().mean().item()
+        uncached, cached = results[False][1], results[True][1]
+        print(f"{seq_len:>10} {uncached:>15.1f} {cached:>13.1f} {cached / uncached:>7.1f}x {match:>6.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="KV-cache generation benchmark (CPU)")
+    parser.add_argument("--seq-lens", type=int, nargs="+", default=[64, 128, 256, 512, 1024])
+    parser.add_argument("--batch-size", type=int, default=4)
+    parser.add_argument("--new-tokens", type=int, default=32)
+    parser.add_argument("--window", type=int, default=None)
+    parser.add_argument("--threads", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    benchmark(args.seq_lens, args.batch_size, args.new_tokens, window=args.window)
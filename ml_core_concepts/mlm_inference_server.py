@@ -0,0 +1,221 @@
+"""Batched fill-mask inference for ``BertForMaskedLM``.
+
+``masked-language-modeling.ipynb`` runs ``pipeline('fill-mask')`` on one
+sentence at a time. ``FillMaskServer`` serves the same tokenizer/model behind
+an asyncio API instead: concurrent requests are collected into micro-batches
+(closed when full or when the oldest request hits ``max_latency_ms``), sorted
+by length and split into sub-batches padded only to their own longest input.
+
+Run ``python mlm_inference_server.py --tiny`` for a load test on a small
+randomly initialised BERT; it prints p50/p99 latency and throughput for
+unbatched and batched serving.
+"""
+import argparse
+import asyncio
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import torch
+from transformers import BertConfig, BertForMaskedLM, BertTokenizer
+
+
+@dataclass
+class _Request:
+    input_ids: list
+    top_k: int
+    future: asyncio.Future
+    arrival: float
+
+
+class FillMaskServer:
+    def __init__(self, model, tokenizer, max_batch_size=32, max_latency_ms=10.0,
+                 inference_batch_size=8, top_k=5):
+        self.model = model.eval()
+        self.tokenizer = tokenizer
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency_ms / 1000
+        self.inference_batch_size = inference_batch_size
+        self.top_k = top_k
+        self._queue = None
+        self._worker = None
+        # A single thread: the model runs one sub-batch at a time while the
+        # event loop keeps accepting requests
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._batch_loop())
+
+    async def stop(self):
+        await self._queue.put(None)
+        await self._worker
+        self._worker = None
+        self._executor.shutdown()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    async def fill_mask(self, text, top_k=None):
+        """Return the top-k predictions for every mask token in ``text``.
+
+        The result has one list per mask, in order, each holding dicts with
+        ``token``, ``token_str`` and ``score`` like the fill-mask pipeline.
+        """
+        if self._worker is None:
+            raise RuntimeError("server is not running, call start() first")
+        input_ids = self.tokenizer(text, truncation=True)["input_ids"]
+        if self.tokenizer.mask_token_id not in input_ids:
+            raise ValueError(f"No {self.tokenizer.mask_token} token found in: {text!r}")
+
+        loop = asyncio.get_running_loop()
+        request = _Request(input_ids, top_k or self.top_k, loop.create_future(), loop.time())
+        await self._queue.put(request)
+        return await request.future
+
+    async def _batch_loop(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            first = await self._queue.get()
+            if first is None:
+                break
+            batch = [first]
+            deadline = first.arrival + self.max_latency
+            while len(batch) < self.max_batch_size:
+                if not self._queue.empty():
+                    request = self._queue.get_nowait()
+                else:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        request = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                if request is None:
+                    stopping = True
+                    break
+                batch.append(request)
+
+            # Sorting by length keeps similarly sized inputs in the same sub-batch
+            batch.sort(key=lambda r: len(r.input_ids))
+            for i in range(0, len(batch), self.inference_batch_size):
+                chunk = batch[i:i + self.inference_batch_size]
+                try:
+                    results = await loop.run_in_executor(self._executor, self._predict, chunk)
+                except Exception as e:
+                    for request in chunk:
+                        if not request.future.done():
+                            request.future.set_exception(e)
+                    continue
+                for request, result in zip(chunk, results):
+                    if not request.future.done():
+                        request.future.set_result(result)
+
+    def _predict(self, requests):
+        max_len = max(len(r.input_ids) for r in requests)
+        input_ids = torch.full((len(requests), max_len), self.tokenizer.pad_token_id, dtype=torch.long)
+        attention_mask = torch.zeros((len(requests), max_len), dtype=torch.long)
+        for i, request in enumerate(requests):
+            input_ids[i, :len(request.input_ids)] = torch.tensor(request.input_ids)
+            attention_mask[i, :len(request.input_ids)] = 1
+
+        with torch.inference_mode():
+            logits = self.model(input_ids=input_ids, attention_mask=attention_mask).logits
+
+        results = []
+        for i, request in enumerate(requests):
+            mask_positions = (input_ids[i] == self.tokenizer.mask_token_id).nonzero().flatten()
+            probs = logits[i, mask_positions].softmax(dim=-1)
+            scores, token_ids = probs.topk(request.top_k, dim=-1)
+            results.append([
+                [
+                    {"token": token_id, "token_str": self.tokenizer.decode([token_id]), "score": score}
+                    for token_id, score in zip(ids.tolist(), values.tolist())
+                ]
+                for ids, values in zip(token_ids, scores)
+            ])
+        return results
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def run_load(server, texts, num_requests, requests_per_second):
+    # Open-loop load generator: Poisson arrivals, independent of response times
+    latencies = []
+
+    async def one_request(text):
+        start = time.perf_counter()
+        await server.fill_mask(text)
+        latencies.append(time.perf_counter() - start)
+
+    rng = random.Random(0)
+    tasks = []
+    start = time.perf_counter()
+    for _ in range(num_requests):
+        tasks.append(asyncio.create_task(one_request(rng.choice(texts))))
+        await asyncio.sleep(rng.expovariate(requests_per_second))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "p50_ms": percentile(latencies, 50) * 1e3,
+        "p99_ms": percentile(latencies, 99) * 1e3,
+        "throughput": num_requests / elapsed,
+    }
+
+
+SAMPLE_TEXTS = [
+    "Transformers are [MASK] state-of-the-art technique in natural language processing.",
+    "The capital of France is [MASK].",
+    "Tomatoes need [MASK] to grow.",
+    "A [MASK] network learns from data by adjusting its [MASK].",
+    "Attention lets the model focus on the most [MASK] parts of the input sequence when it "
+    "builds a representation for each token in a long sentence.",
+]
+
+
+async def main(args):
+    tokenizer = BertTokenizer.from_pretrained(args.model)
+    if args.tiny:
+        config = BertConfig(
+            vocab_size=tokenizer.vocab_size, hidden_size=64, num_hidden_layers=2,
+            num_attention_heads=2, intermediate_size=128,
+        )
+        model = BertForMaskedLM(config)
+    else:
+        model = BertForMaskedLM.from_pretrained(args.model)
+
+    print(f"{'mode':>10} {'p50 ms':>8} {'p99 ms':>8} {'req/s':>8}")
+    for mode, max_batch_size in (("unbatched", 1), ("batched", args.max_batch_size)):
+        server = FillMaskServer(
+            model, tokenizer, max_batch_size=max_batch_size,
+            max_latency_ms=args.max_latency_ms, inference_batch_size=args.inference_batch_size,
+        )
+        async with server:
+            stats = await run_load(server, SAMPLE_TEXTS, args.num_requests, args.rate)
+        print(f"{mode:>10} {stats['p50_ms']:>8.1f} {stats['p99_ms']:>8.1f} {stats['throughput']:>8.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fill-mask micro-batching load test (CPU)")
+    parser.add_argument("--model", default="bert-base-uncased")
+    parser.add_argument("--tiny", action="store_true", help="use a small randomly initialised BERT")
+    parser.add_argument("--num-requests", type=int, default=500)
+    parser.add_argument("--rate", type=float, default=200.0, help="requests per second")
+    parser.add_argument("--max-batch-size", type=int, default=32)
+    parser.add_argument("--inference-batch-size", type=int, default=8)
+    parser.add_argument("--max-latency-ms", type=float, default=10.0)
+    args = parser.parse_args()
+
+    asyncio.run(main(args))
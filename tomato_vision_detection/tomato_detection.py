@@ -31,21 +31,22 @@ def show_images(images, num_images=5):
         axes[i].axis('off')
     plt.show()
 
-# Set the path to your dataset
-dataset_path = 'path/to/your/extracted/dataset'
+if __name__ == "__main__":
+    # Set the path to your dataset
+    dataset_path = 'path/to/your/extracted/dataset'
 
-# Create the dataset and dataloader
-transform = transforms.Compose([
-    transforms.ToPILImage(),
-    transforms.Resize((224, 224)),
-    transforms.ToTensor(),
-])
+    # Create the dataset and dataloader
+    transform = transforms.Compose([
+        transforms.ToPILImage(),
+        transforms.Resize((224, 224)),
+        transforms.ToTensor(),
+    ])
 
-dataset = TomatoDataset(dataset_path, transform=transform)
-dataloader = DataLoader(dataset, batch_size=5, shuffle=True)
+    dataset = TomatoDataset(dataset_path, transform=transform)
+    dataloader = DataLoader(dataset, batch_size=5, shuffle=True)
 
-# Display some sample images
-sample_batch = next(iter(dataloader))
-show_images(sample_batch.permute(0, 2, 3, 1).numpy())
+    # Display some sample images
+    sample_batch = next(iter(dataloader))
+    show_images(sample_batch.permute(0, 2, 3, 1).numpy())
 
-print(f"Total images in the dataset: {len(dataset)}")
\ No newline at end of file
+    print(f"Total images in the dataset: {len(dataset)}")
\ No newline at end of file
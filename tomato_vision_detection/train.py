@@ -0,0 +1,257 @@
+"""Local, CPU-friendly training for the tomato classifier.
+
+The images are first packed into fixed-size ``.npy`` shards, which training
+then memory-maps one at a time, so the dataset never has to fit in RAM.
+Checkpoints are written atomically every few optimizer steps and record the
+exact sample offset inside the current epoch, so an interrupted run resumes
+where it stopped instead of redoing finished work.
+
+Usage (from the repository root):
+
+    python -m tomato_vision_detection.train shard --data-dir path/to/dataset --out-dir shards
+    python -m tomato_vision_detection.train train --shard-dir shards --checkpoint ckpt.pt
+
+``--data-dir`` holds one sub-directory of ``.jpg`` files per class.
+"""
+import argparse
+import json
+import os
+import random
+import time
+
+import numpy as np
+import torch
+import torch.nn as nn
+from torch.utils.data import DataLoader, IterableDataset
+from torchvision import models, transforms
+
+from tomato_vision_detection.tomato_detection import TomatoDataset
+
+INDEX_FILE = "index.json"
+# Settings that determine the sample order and accumulation boundaries; a
+# checkpoint's offset is only meaningful if they match on resume
+RESUME_KEYS = ("seed", "batch_size", "accumulation_steps")
+
+
+def write_shards(data_dir, out_dir, shard_size=256, image_size=224, seed=0):
+    classes = sorted(d for d in os.listdir(data_dir) if os.path.isdir(os.path.join(data_dir, d)))
+    resize = transforms.Compose([
+        transforms.ToPILImage(),
+        transforms.Resize((image_size, image_size)),
+    ])
+    os.makedirs(out_dir, exist_ok=True)
+
+    # Shuffle across classes before packing: training only shuffles shard order
+    # and samples within a shard, so a single-class shard means single-class batches
+    samples = []
+    for label, class_name in enumerate(classes):
+        dataset = TomatoDataset(os.path.join(data_dir, class_name), transform=resize)
+        samples.extend((dataset, i, label) for i in range(len(dataset)))
+    random.Random(seed).shuffle(samples)
+
+    shards = []
+    images, labels = [], []
+
+    def flush():
+        name = f"shard_{len(shards):05d}"
+        np.save(os.path.join(out_dir, f"{name}.images.npy"), np.stack(images))
+        np.save(os.path.join(out_dir, f"{name}.labels.npy"), np.array(labels, dtype=np.int64))
+        shards.append({"name": name, "size": len(labels)})
+        images.clear()
+        labels.clear()
+
+    # Only one shard worth of images is held in memory at a time
+    for dataset, i, label in samples:
+        images.append(np.asarray(dataset[i], dtype=np.uint8))
+        labels.append(label)
+        if len(labels) == shard_size:
+            flush()
+    if labels:
+        flush()
+
+    with open(os.path.join(out_dir, INDEX_FILE), "w") as f:
+        json.dump({"classes": classes, "image_size": image_size, "seed": seed, "shards": shards}, f, indent=2)
+    print(f"Wrote {len(samples)} images in {len(shards)} shards to {out_dir}")
+
+
+class ShardedTomatoDataset(IterableDataset):
+    """Streams (image, label) pairs from memory-mapped shards.
+
+    The sample order of an epoch depends only on ``seed`` and the epoch
+    number, so ``set_position(epoch, offset)`` can skip straight to the
+    ``offset``-th sample without reading any of the ones before it.
+    """
+
+    def __init__(self, shard_dir, seed=0, shuffle=True):
+        with open(os.path.join(shard_dir, INDEX_FILE)) as f:
+            index = json.load(f)
+        self.shard_dir = shard_dir
+        self.classes = index["classes"]
+        self.shards = index["shards"]
+        self.seed = seed
+        self.shuffle = shuffle
+        self.epoch = 0
+        self.offset = 0
+        self.normalize = transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225])
+
+    def __len__(self):
+        return sum(s["size"] for s in self.shards)
+
+    def set_position(self, epoch, offset=0):
+        self.epoch = epoch
+        self.offset = offset
+
+    def _epoch_order(self):
+        rng = random.Random(self.seed * 1_000_003 + self.epoch)
+        shard_order = list(range(len(self.shards)))
+        if self.shuffle:
+            rng.shuffle(shard_order)
+        for shard_idx in shard_order:
+            sample_order = list(range(self.shards[shard_idx]["size"]))
+            if self.shuffle:
+                rng.shuffle(sample_order)
+            yield shard_idx, sample_order
+
+    def __iter__(self):
+        skip = self.offset
+        for shard_idx, sample_order in self._epoch_order():
+            if skip >= len(sample_order):
+                skip -= len(sample_order)
+                continue
+            name = self.shards[shard_idx]["name"]
+            images = np.load(os.path.join(self.shard_dir, f"{name}.images.npy"), mmap_mode="r")
+            labels = np.load(os.path.join(self.shard_dir, f"{name}.labels.npy"), mmap_mode="r")
+            for i in sample_order[skip:]:
+                image = torch.from_numpy(np.array(images[i])).permute(2, 0, 1).float() / 255
+                yield self.normalize(image), int(labels[i])
+            skip = 0
+
+
+def save_checkpoint(path, model, optimizer, epoch, offset, step, config):
+    # Write to a temporary file, fsync it and rename, so neither a crash nor a
+    # power loss leaves a torn checkpoint
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        torch.save({
+            "model": model.state_dict(),
+            "optimizer": optimizer.state_dict(),
+            "epoch": epoch,
+            "offset": offset,
+            "step": step,
+            "config": config,
+        }, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    if os.name == "posix":
+        # Persist the rename itself
+        dir_fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+def train(args):
+    torch.set_num_threads(args.threads)
+    torch.manual_seed(args.seed)
+
+    dataset = ShardedTomatoDataset(args.shard_dir, seed=args.seed)
+    model = models.resnet18(weights=None, num_classes=len(dataset.classes))
+    optimizer = torch.optim.AdamW(model.parameters(), lr=args.lr)
+    criterion = nn.CrossEntropyLoss()
+
+    config = {k: getattr(args, k) for k in RESUME_KEYS}
+    epoch, offset, step = 0, 0, 0
+    if os.path.exists(args.checkpoint):
+        checkpoint = torch.load(args.checkpoint)
+        saved_config = checkpoint.get("config", {})
+        mismatched = {
+            k: (saved_config.get(k), config[k])
+            for k in RESUME_KEYS if saved_config.get(k) != config[k]
+        }
+        if mismatched:
+            details = ", ".join(f"{k}={old} (now {new})" for k, (old, new) in mismatched.items())
+            raise ValueError(
+                f"Checkpoint {args.checkpoint} was written with {details}; "
+                "resume with the same settings or use a new --checkpoint"
+            )
+        model.load_state_dict(checkpoint["model"])
+        optimizer.load_state_dict(checkpoint["optimizer"])
+        epoch, offset, step = checkpoint["epoch"], checkpoint["offset"], checkpoint["step"]
+        print(f"Resuming from epoch {epoch}, sample {offset}, step {step}")
+
+    model.train()
+    while epoch < args.epochs:
+        dataset.set_position(epoch, offset)
+        # num_workers=0 keeps the sample offset exact; parallelism comes from intra-op threads
+        loader = DataLoader(dataset, batch_size=args.batch_size, num_workers=0)
+        optimizer.zero_grad()
+        pending, running_loss = 0, 0.0
+        start_offset, start = offset, time.perf_counter()
+
+        for images, labels in loader:
+            loss = criterion(model(images), labels) / args.accumulation_steps
+            loss.backward()
+            running_loss += loss.item()
+            offset += len(labels)
+            pending += 1
+            if pending < args.accumulation_steps:
+                continue
+
+            optimizer.step()
+            optimizer.zero_grad()
+            pending = 0
+            step += 1
+            if step % args.log_every == 0:
+                print(f"epoch {epoch} sample {offset}/{len(dataset)} step {step} "
+                      f"loss {running_loss / args.log_every:.4f} "
+                      f"({(offset - start_offset) / (time.perf_counter() - start):.1f} img/s)")
+                running_loss = 0.0
+            # Checkpoints only land on optimizer-step boundaries, so no partially
+            # accumulated gradient is ever lost on resume
+            if step % args.checkpoint_every == 0:
+                save_checkpoint(args.checkpoint, model, optimizer, epoch, offset, step, config)
+
+        if pending:
+            # Losses were divided by accumulation_steps, but only `pending`
+            # micro-batches contributed to this last group
+            for p in model.parameters():
+                if p.grad is not None:
+                    p.grad.mul_(args.accumulation_steps / pending)
+            optimizer.step()
+            optimizer.zero_grad()
+            step += 1
+        epoch, offset = epoch + 1, 0
+        save_checkpoint(args.checkpoint, model, optimizer, epoch, offset, step, config)
+        print(f"Finished epoch {epoch - 1}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tomato classifier training")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    shard_parser = subparsers.add_parser("shard", help="pack a class-per-directory dataset into shards")
+    shard_parser.add_argument("--data-dir", required=True)
+    shard_parser.add_argument("--out-dir", required=True)
+    shard_parser.add_argument("--shard-size", type=int, default=256)
+    shard_parser.add_argument("--image-size", type=int, default=224)
+    shard_parser.add_argument("--seed", type=int, default=0)
+
+    train_parser = subparsers.add_parser("train", help="train from shards, resuming from --checkpoint")
+    train_parser.add_argument("--shard-dir", required=True)
+    train_parser.add_argument("--checkpoint", default="tomato_checkpoint.pt")
+    train_parser.add_argument("--epochs", type=int, default=10)
+    train_parser.add_argument("--batch-size", type=int, default=16)
+    train_parser.add_argument("--accumulation-steps", type=int, default=4)
+    train_parser.add_argument("--lr", type=float, default=1e-3)
+    train_parser.add_argument("--threads", type=int, default=os.cpu_count())
+    train_parser.add_argument("--checkpoint-every", type=int, default=50)
+    train_parser.add_argument("--log-every", type=int, default=10)
+    train_parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.command == "shard":
+        write_shards(args.data_dir, args.out_dir, args.shard_size, args.image_size, args.seed)
+    else:
+        train(args)